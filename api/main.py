@@ -1,15 +1,22 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
 import logging
-from breakout.analyzer import analyze_vrz_vwap
-from breakout.db import insert_failures
-from breakout.settings import DEFAULT_INTERVAL, DEFAULT_PERIOD
+from breakout.analyzer import analyze_vrz_vwap, analyze_vrz_vwap_df, download_ohlcv_bulk, nse_symbol
+from breakout.db import insert_failures_async
+from breakout.settings import DEFAULT_INTERVAL, DEFAULT_PERIOD, ANALYZE_WORKERS, ANALYZE_TIMEOUT
 
 logger = logging.getLogger("uvicorn.error")
 
 app = FastAPI(title="Breakout Failures API")
 
+# Shared pool for blocking analysis work (yfinance I/O + pandas)
+EXECUTOR = ThreadPoolExecutor(max_workers=ANALYZE_WORKERS)
+
 class FailureResponse(BaseModel):
     company: str
     ticker: str
@@ -25,6 +32,14 @@ class AnalyzeRequest(BaseModel):
     interval: Optional[str] = DEFAULT_INTERVAL
     period: Optional[str] = DEFAULT_PERIOD
 
+async def _run_in_executor(func, *args, **kwargs):
+    """
+    Run a blocking call on the shared executor, bounded by ANALYZE_TIMEOUT.
+    """
+    loop = asyncio.get_running_loop()
+    call = partial(func, *args, **kwargs)
+    return await asyncio.wait_for(loop.run_in_executor(EXECUTOR, call), timeout=ANALYZE_TIMEOUT)
+
 @app.post("/analyze", response_model=List[FailureResponse])
 async def analyze_single(req: AnalyzeRequest, background_tasks: BackgroundTasks):
     """
@@ -32,10 +47,11 @@ async def analyze_single(req: AnalyzeRequest, background_tasks: BackgroundTasks)
     """
     ticker = req.ticker
     company = req.company or req.ticker
-    failures = analyze_vrz_vwap(ticker, company, interval=req.interval, period=req.period)
-    if failures is None:
-        # Return empty list instead of None to keep API consistent
-        return []
+    # Download + analysis are blocking; run them off the event loop
+    try:
+        failures, _ = await _run_in_executor(analyze_vrz_vwap, ticker, company, interval=req.interval, period=req.period)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Timed out analyzing {ticker}")
     # Convert datetimes to ISO strings
     for f in failures:
         if hasattr(f['failure_time'], 'isoformat'):
@@ -44,8 +60,8 @@ async def analyze_single(req: AnalyzeRequest, background_tasks: BackgroundTasks)
             f['break_time'] = f['break_time'].isoformat()
 
     if req.save_to_db and failures:
-        # Use background task so request doesn't block on DB I/O
-        background_tasks.add_task(insert_failures, [{
+        # Async background task: runs on the event loop after the response, no worker thread held
+        background_tasks.add_task(insert_failures_async, [{
             "company": f["company"],
             "ticker": f["ticker"],
             "location": f["location"],
@@ -56,19 +72,47 @@ async def analyze_single(req: AnalyzeRequest, background_tasks: BackgroundTasks)
 @app.post("/analyze/batch", response_model=List[FailureResponse])
 async def analyze_batch(requests: List[AnalyzeRequest], background_tasks: BackgroundTasks):
     """
-    Analyze a batch of tickers in serial (you can later parallelize).
+    Analyze a batch of tickers: OHLCV data is bulk-downloaded per (interval, period)
+    and each ticker is then analyzed concurrently on the shared executor.
     """
-    all_failures = []
+    # One bulk download per (interval, period) combination
+    groups: Dict[Tuple[str, str], List[AnalyzeRequest]] = defaultdict(list)
     for req in requests:
-        comp = req.company or req.ticker
-        failures = analyze_vrz_vwap(req.ticker, comp, interval=req.interval, period=req.period)
-        if failures:
-            for f in failures:
-                if hasattr(f['failure_time'], 'isoformat'):
-                    f['failure_time'] = f['failure_time'].isoformat()
-                if 'break_time' in f and hasattr(f['break_time'], 'isoformat'):
-                    f['break_time'] = f['break_time'].isoformat()
-            all_failures.extend(failures)
+        groups[(req.interval, req.period)].append(req)
+
+    async def fetch_group(interval: str, period: str, reqs: List[AnalyzeRequest]) -> Dict:
+        symbols = [nse_symbol(r.ticker) for r in reqs]
+        try:
+            return await _run_in_executor(download_ohlcv_bulk, symbols, period=period, interval=interval)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out fetching {symbols} after {ANALYZE_TIMEOUT}s")
+            return {}
+
+    fetched = await asyncio.gather(*(fetch_group(iv, p, reqs) for (iv, p), reqs in groups.items()))
+    frames = dict(zip(groups.keys(), fetched))
+
+    async def analyze_one(req: AnalyzeRequest) -> List[Dict]:
+        df = frames[(req.interval, req.period)].get(nse_symbol(req.ticker))
+        if df is None:
+            return []
+        # Copy so duplicate tickers in one batch don't share a frame across threads
+        try:
+            failures, _ = await _run_in_executor(analyze_vrz_vwap_df, df.copy(), req.ticker, req.company or req.ticker)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out analyzing {req.ticker} after {ANALYZE_TIMEOUT}s")
+            return []
+        return failures
+
+    results = await asyncio.gather(*(analyze_one(req) for req in requests))
+
+    all_failures = []
+    for failures in results:
+        for f in failures:
+            if hasattr(f['failure_time'], 'isoformat'):
+                f['failure_time'] = f['failure_time'].isoformat()
+            if 'break_time' in f and hasattr(f['break_time'], 'isoformat'):
+                f['break_time'] = f['break_time'].isoformat()
+        all_failures.extend(failures)
 
     if any(r.save_to_db for r in requests) and all_failures:
         # convert and store all at once
@@ -78,6 +122,6 @@ async def analyze_batch(requests: List[AnalyzeRequest], background_tasks: Backgr
             "location": f["location"],
             "failure_time": f["failure_time"]
         } for f in all_failures]
-        background_tasks.add_task(insert_failures, payload)
+        background_tasks.add_task(insert_failures_async, payload)
 
     return all_failures
@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
-import time
-from breakout.analyzer import analyze_vrz_vwap, plot_vrz_failures
+from typing import Tuple
+from breakout.analyzer import analyze_vrz_vwap_df, download_ohlcv_bulk, nse_symbol, plot_vrz_failures
 from breakout.db import insert_failures
-from breakout.settings import LOCAL_WINDOW, K_FACTOR, DEFAULT_INTERVAL, DEFAULT_PERIOD
+from breakout.settings import LOCAL_WINDOW, K_FACTOR, DEFAULT_INTERVAL, DEFAULT_PERIOD, CACHE_TTL
 
 # -------------------- Sample NIFTY 50 subset --------------------
 NIFTY50_SAMPLE = {
@@ -14,6 +14,16 @@ NIFTY50_SAMPLE = {
     "ICICIBANK.NS": "ICICI Bank"
 }
 
+# -------------------- Cached compute --------------------
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def cached_download(symbols: Tuple[str, ...], period: str, interval: str):
+    return download_ohlcv_bulk(list(symbols), period=period, interval=interval)
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def cached_analyze(ticker: str, company: str, k: float, window: int, interval: str, period: str, _df: pd.DataFrame):
+    # _df is not hashed: within the TTL, (ticker, interval, period) identifies the frame
+    return analyze_vrz_vwap_df(_df.copy(), ticker, company, k=k, window=window)
+
 # -------------------- Streamlit UI --------------------
 st.set_page_config(page_title="Breakout Failures", layout="wide")
 st.title("⚠️ Breakout Failures — Streamlit")
@@ -42,25 +52,28 @@ if run_btn:
     status.text(f"Analyzing {len(tickers)} tickers...")
     prog = st.progress(0)
 
+    # Fetch every ticker in one bulk request, then analyze each frame
+    spinner.info("Downloading...")
+    frames = cached_download(tuple(nse_symbol(t) for t in tickers), period, interval)
+    spinner.info("Computing...")
+
+    outcomes = {}
     for idx, t in enumerate(tickers, start=1):
         status.text(f"Analyzing {t} ({idx}/{len(tickers)})")
-        spinner.info("Downloading and computing...")
+        df_price = frames.get(nse_symbol(t))
+        if df_price is None:
+            outcomes[t] = ([], pd.DataFrame())
+        else:
+            outcomes[t] = cached_analyze(t, NIFTY50_SAMPLE.get(t, t), k, window, interval, period, df_price)
 
-        failures, df_price = analyze_vrz_vwap(
-            t,
-            NIFTY50_SAMPLE.get(t, t),
-            k=k,
-            window=window,
-            interval=interval,
-            period=period
-        )
+        prog.progress(idx / len(tickers))
 
+    # Collect results in input order
+    for t in tickers:
+        failures, _ = outcomes[t]
         if failures:
             results.extend(failures)
 
-        prog.progress(idx / len(tickers))
-        time.sleep(0.1)
-
     spinner.empty()
     status.empty()
     prog.empty()
@@ -85,11 +98,10 @@ if run_btn:
         if show_chart:
             st.markdown("### 📊 VRZ Breakout Failure Charts")
             for t in tickers:
-                t_failures = [f for f in results if f["ticker"] == t]
+                t_failures, df_price = outcomes[t]
                 if not t_failures:
                     continue
 
-                # Use the same df_price if cached, else re-run
                 fig = plot_vrz_failures(df_price, t_failures, NIFTY50_SAMPLE.get(t, t), t)
                 if fig:
                     st.plotly_chart(fig, use_container_width=True)
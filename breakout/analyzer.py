@@ -3,50 +3,167 @@ import pandas as pd
 import numpy as np
 import yfinance as yf
 import logging
+import threading
 import plotly.graph_objects as go
-from .indicators import compute_atr, find_local_maxima, find_local_minima
+from .cache import REQUIRED_COLS, get_http_session, is_fresh, load_ohlcv, merge_ohlcv, store_ohlcv
+from .indicators import compute_atr, compute_vwap_bands, find_band_failures, find_local_maxima, find_local_minima
 from .settings import K_FACTOR, LOCAL_WINDOW
 
 logger = logging.getLogger(__name__)
 
+# yf.download keeps its results in module-global state (shared._DFS) that every
+# call resets, so concurrent multi-symbol downloads would clobber each other
+_YF_LOCK = threading.Lock()
+
 # -----------------------------------------------------------------------------
 # ✅ 1. Data Fetching
 # -----------------------------------------------------------------------------
+def nse_symbol(ticker: str) -> str:
+    """
+    Yahoo Finance symbol for an NSE ticker ('RELIANCE' -> 'RELIANCE.NS').
+    """
+    return ticker if ticker.endswith(".NS") else f"{ticker}.NS"
+
+def _normalize_ohlcv(df: pd.DataFrame, symbol: str) -> Optional[pd.DataFrame]:
+    """
+    Flatten, clean and validate a raw yfinance frame for a single symbol.
+    """
+    # Flatten multi-level columns if present
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [col[0] for col in df.columns]
+
+    # Drop NA and reset index
+    df = df.dropna().reset_index()
+    if df.empty:
+        logger.warning(f"No data returned for {symbol}")
+        return None
+
+    # Normalize column name
+    if "Datetime" in df.columns:
+        df.rename(columns={"Datetime": "Date"}, inplace=True)
+
+    if not REQUIRED_COLS.issubset(df.columns):
+        logger.warning(f"Missing required OHLCV columns in {symbol}")
+        return None
+
+    # Multi-symbol yf.download labels the (already exchange-local) index as UTC;
+    # store naive exchange-local times like single-symbol downloads
+    if isinstance(df["Date"].dtype, pd.DatetimeTZDtype):
+        df["Date"] = df["Date"].dt.tz_localize(None)
+
+    return df
+
+def _download(tickers, **kwargs) -> pd.DataFrame:
+    """
+    Multi-symbol yf.download with the repo defaults and the shared HTTP cache session.
+    Calls are serialized; each call still fetches its tickers in parallel.
+    """
+    with _YF_LOCK:
+        return yf.download(tickers, progress=False, ignore_tz=True, session=get_http_session(), **kwargs)
+
+def _history(symbol: str, **kwargs) -> pd.DataFrame:
+    """
+    Single-symbol fetch via Ticker.history, which (unlike yf.download) does not
+    reset yfinance's shared state and so runs without the download lock.
+    Returns the same unadjusted columns and naive exchange-local index as _download.
+    """
+    df = yf.Ticker(symbol, session=get_http_session()).history(auto_adjust=False, actions=False, **kwargs)
+    if not df.empty:
+        df.index = df.index.tz_localize(None)
+    return df
+
 def get_intraday_data(symbol: str, period: str = "5d", interval: str = "15m") -> Optional[pd.DataFrame]:
     """
     Fetch intraday OHLCV data for NSE stocks using Yahoo Finance.
     Example symbol: 'RELIANCE.NS', 'TCS.NS', etc.
+    Results are cached on disk; a stale cache is updated with only the bars
+    since its last timestamp instead of re-downloading the whole period.
     """
+    cached = load_ohlcv(symbol, interval, period)
+    if cached is not None and is_fresh(symbol, interval, period):
+        return cached
+
+    try:
+        if cached is not None and not cached.empty:
+            logger.info(f"Updating cached {symbol} data from Yahoo Finance...")
+            # raise_errors: a failed fetch (429, network, a start Yahoo no longer serves) must
+            # not look like "no new bars", or the stale frame would be re-stamped as fresh
+            new = _history(symbol, start=cached["Date"].iloc[-1], interval=interval, raise_errors=True)
+            new = _normalize_ohlcv(new, symbol) if not new.empty else None
+            # No new bars (e.g. market closed): keep serving the cached frame
+            df = cached if new is None else merge_ohlcv(cached, new, period)
+            store_ohlcv(symbol, interval, period, df)
+            return df
+    except Exception as e:
+        logger.warning(f"Incremental update failed for {symbol}, refetching: {e}")
+
     try:
         logger.info(f"Fetching {symbol} data from Yahoo Finance...")
-        df = yf.download(symbol, period=period, interval=interval, progress=False, ignore_tz=True)
+        df = _history(symbol, period=period, interval=interval)
 
         if df.empty:
             logger.warning(f"No data returned for {symbol}")
             return None
 
-        # Flatten multi-level columns if present
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = [col[0] for col in df.columns]
-
-        # Drop NA and reset index
-        df = df.dropna().reset_index()
-
-        # Normalize column name
-        if "Datetime" in df.columns:
-            df.rename(columns={"Datetime": "Date"}, inplace=True)
-
-        required_cols = {"Open", "High", "Low", "Close", "Volume"}
-        if not required_cols.issubset(df.columns):
-            logger.warning(f"Missing required OHLCV columns in {symbol}")
-            return None
-
+        df = _normalize_ohlcv(df, symbol)
+        if df is not None:
+            store_ohlcv(symbol, interval, period, df)
         return df
 
     except Exception as e:
         logger.error(f"Error fetching Yahoo data for {symbol}: {e}")
         return None
 
+def download_ohlcv_bulk(symbols: List[str], period: str = "5d", interval: str = "15m") -> Dict[str, pd.DataFrame]:
+    """
+    Fetch OHLCV data for several symbols with a single yf.download call.
+    Returns {symbol: frame} in the same shape as get_intraday_data; symbols
+    without usable data are left out. Symbols with a fresh disk cache are not
+    downloaded again.
+    """
+    frames = {}
+    missing = []
+    for symbol in dict.fromkeys(symbols):
+        cached = load_ohlcv(symbol, interval, period) if is_fresh(symbol, interval, period) else None
+        if cached is not None:
+            frames[symbol] = cached
+        else:
+            missing.append(symbol)
+    if not missing:
+        return frames
+
+    # yf.download upper-cases tickers (and collapses case-only duplicates), so
+    # results are keyed by the upper-cased symbol and mapped back per caller spelling
+    tickers = list(dict.fromkeys(symbol.upper() for symbol in missing))
+    try:
+        logger.info(f"Fetching {len(tickers)} symbols from Yahoo Finance...")
+        raw = _download(tickers, period=period, interval=interval, group_by="ticker", threads=True)
+    except Exception as e:
+        logger.error(f"Error fetching Yahoo data for {missing}: {e}")
+        return frames
+
+    if raw.empty:
+        logger.warning(f"No data returned for {missing}")
+        return frames
+
+    grouped = isinstance(raw.columns, pd.MultiIndex)
+    available = set(raw.columns.get_level_values(0)) if grouped else set()
+    for symbol in missing:
+        if grouped:
+            if symbol.upper() not in available:
+                logger.warning(f"No data returned for {symbol}")
+                continue
+            sub = raw[symbol.upper()].copy()
+        elif len(tickers) == 1:
+            sub = raw.copy()
+        else:
+            continue
+        df = _normalize_ohlcv(sub, symbol)
+        if df is not None:
+            store_ohlcv(symbol, interval, period, df)
+            frames[symbol] = df
+    return frames
+
 # -----------------------------------------------------------------------------
 # ✅ 2. VRZ Analysis
 # -----------------------------------------------------------------------------
@@ -61,46 +178,58 @@ def analyze_vrz_vwap(
     """
     Analyze VRZ (Volatility Range Zone) breakout failures using VWAP bands.
     """
-    full_ticker = ticker if ticker.endswith(".NS") else f"{ticker}.NS"
+    full_ticker = nse_symbol(ticker)
+    df = get_intraday_data(full_ticker, period=period, interval=interval)
+    if df is None or df.empty:
+        logger.warning(f"No data for {full_ticker}")
+        return [], pd.DataFrame()
+    return analyze_vrz_vwap_df(df, full_ticker, company_name, k=k, window=window)
+
+def analyze_vrz_vwap_df(
+    df: pd.DataFrame,
+    ticker: str,
+    company_name: str,
+    k: float = 2.0,
+    window: int = 20
+) -> Tuple[List[Dict], pd.DataFrame]:
+    """
+    Run the VRZ VWAP-band analysis on an already downloaded OHLCV frame.
+    Indicator columns are added to `df` in place.
+    """
+    full_ticker = nse_symbol(ticker)
     try:
-        df = get_intraday_data(full_ticker, period=period, interval=interval)
-        if df is None or df.empty:
-            logger.warning(f"No data for {full_ticker}")
-            return [], pd.DataFrame()
-
-        # Compute VWAP
-        df["VWAP"] = (df["Volume"] * (df["High"] + df["Low"] + df["Close"]) / 3).cumsum() / df["Volume"].cumsum()
-
-        # Compute ATR (simple rolling high-low range)
-        df["ATR"] = (df["High"] - df["Low"]).rolling(window=window, min_periods=1).mean()
-
-        # Upper and lower VRZ bands
-        df["upper_band"] = df["VWAP"] + k * df["ATR"]
-        df["lower_band"] = df["VWAP"] - k * df["ATR"]
-
-        failures = []
-        for i in range(1, len(df)):
-            prev_close, curr_close = df["Close"].iloc[i - 1], df["Close"].iloc[i]
-            prev_upper, curr_upper = df["upper_band"].iloc[i - 1], df["upper_band"].iloc[i]
-            prev_lower, curr_lower = df["lower_band"].iloc[i - 1], df["lower_band"].iloc[i]
-
-            # Detect upper band failure (cross from above → below)
-            if prev_close > prev_upper and curr_close < curr_upper:
-                failures.append({
-                    "company": company_name,
-                    "ticker": full_ticker,
-                    "location": "VRZ High Failure",
-                    "failure_time": df["Date"].iloc[i],
-                })
-
-            # Detect lower band failure (cross from below → above)
-            elif prev_close < prev_lower and curr_close > curr_lower:
-                failures.append({
-                    "company": company_name,
-                    "ticker": full_ticker,
-                    "location": "VRZ Low Failure",
-                    "failure_time": df["Date"].iloc[i],
-                })
+        # Pull the OHLCV columns out once and compute indicators on plain arrays
+        high = df["High"].to_numpy(dtype=float)
+        low = df["Low"].to_numpy(dtype=float)
+        close = df["Close"].to_numpy(dtype=float)
+        volume = df["Volume"].to_numpy(dtype=float)
+
+        vwap, atr, upper, lower = compute_vwap_bands(high, low, close, volume, k, window)
+
+        df["VWAP"] = vwap
+        df["ATR"] = atr
+        df["upper_band"] = upper
+        df["lower_band"] = lower
+
+        fail_idx, is_high = find_band_failures(close, upper, lower)
+
+        # Gather each field in one take (pd.Timestamp keeps .isoformat())
+        dates = pd.to_datetime(df["Date"])
+        failure_times = dates.iloc[fail_idx].tolist()
+        break_times = dates.iloc[fail_idx - 1].tolist()
+        closes = close[fail_idx].tolist()
+
+        failures = [
+            {
+                "company": company_name,
+                "ticker": full_ticker,
+                "location": "VRZ High Failure" if high_fail else "VRZ Low Failure",
+                "failure_time": ts,
+                "break_time": break_ts,
+                "close_at_failure": close_at,
+            }
+            for ts, break_ts, close_at, high_fail in zip(failure_times, break_times, closes, is_high)
+        ]
 
         return failures, df
 
@@ -119,15 +248,17 @@ def plot_vrz_failures(df: pd.DataFrame, failures: List[Dict], company_name: str,
         logger.warning(f"No data to plot for {ticker}")
         return None
 
-    # Ensure datetime conversion
+    # Ensure datetime dtype (only parse when not already datetime64)
     time_col = "Date"
-    df[time_col] = pd.to_datetime(df[time_col])
+    times = df[time_col]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times)
 
     fig = go.Figure()
 
     # 1️⃣ Candlestick Chart
     fig.add_trace(go.Candlestick(
-        x=df[time_col],
+        x=times,
         open=df["Open"],
         high=df["High"],
         low=df["Low"],
@@ -140,13 +271,13 @@ def plot_vrz_failures(df: pd.DataFrame, failures: List[Dict], company_name: str,
 
     # 2️⃣ VRZ Bands
     fig.add_trace(go.Scatter(
-        x=df[time_col],
+        x=times,
         y=df["upper_band"],
         line=dict(color="orange", width=1.5, dash="dash"),
         name="VRZ High"
     ))
     fig.add_trace(go.Scatter(
-        x=df[time_col],
+        x=times,
         y=df["lower_band"],
         line=dict(color="cyan", width=1.5, dash="dash"),
         name="VRZ Low"
@@ -156,23 +287,25 @@ def plot_vrz_failures(df: pd.DataFrame, failures: List[Dict], company_name: str,
     high_fail_x, high_fail_y = [], []
     low_fail_x, low_fail_y = [], []
 
-    for f in failures:
-        ft = pd.to_datetime(f["failure_time"])
-        loc = f["location"]
-
-        # Find nearest time (avoid exact match issues)
-        idx = (df[time_col] - ft).abs().idxmin()
-        y_val = df.loc[idx, "Close"]
+    if failures and len(times):
+        fail_times = pd.to_datetime([f["failure_time"] for f in failures])
+        is_high = np.array(["High" in f["location"] for f in failures])
 
-        if "High" in loc:
-            high_fail_x.append(ft)
-            high_fail_y.append(y_val)
+        # Find nearest bar per failure (avoid exact match issues); times are sorted
+        t = times.to_numpy(dtype="datetime64[ns]")
+        ft = fail_times.to_numpy(dtype="datetime64[ns]")
+        if len(t) > 1:
+            idx = np.searchsorted(t, ft).clip(1, len(t) - 1)
+            idx -= (ft - t[idx - 1]) <= (t[idx] - ft)
         else:
-            low_fail_x.append(ft)
-            low_fail_y.append(y_val)
+            idx = np.zeros(len(ft), dtype=int)
+        y_vals = df["Close"].to_numpy()[idx]
+
+        high_fail_x, high_fail_y = fail_times[is_high], y_vals[is_high]
+        low_fail_x, low_fail_y = fail_times[~is_high], y_vals[~is_high]
 
     # Add all failures in one trace each (cleaner legend)
-    if high_fail_x:
+    if len(high_fail_x):
         fig.add_trace(go.Scatter(
             x=high_fail_x, y=high_fail_y,
             mode="markers",
@@ -180,7 +313,7 @@ def plot_vrz_failures(df: pd.DataFrame, failures: List[Dict], company_name: str,
             name="🔴 VRZ High Failures"
         ))
 
-    if low_fail_x:
+    if len(low_fail_x):
         fig.add_trace(go.Scatter(
             x=low_fail_x, y=low_fail_y,
             mode="markers",
@@ -0,0 +1,110 @@
+from typing import Optional
+from functools import lru_cache
+from pathlib import Path
+import os
+import tempfile
+import time
+import logging
+import pandas as pd
+import requests_cache
+from .settings import CACHE_DIR, CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Columns every normalized OHLCV frame must carry
+REQUIRED_COLS = frozenset(("Open", "High", "Low", "Close", "Volume"))
+
+# -----------------------------------------------------------------------------
+# HTTP cache (shared session for yfinance requests)
+# -----------------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def get_http_session() -> requests_cache.CachedSession:
+    """
+    requests session backed by a sqlite HTTP cache; pass as `session=` to yfinance.
+    """
+    Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
+    return requests_cache.CachedSession(
+        str(Path(CACHE_DIR) / "yf_http"),
+        backend="sqlite",
+        expire_after=CACHE_TTL,
+        allowable_codes=(200,),
+        stale_if_error=True,
+    )
+
+# -----------------------------------------------------------------------------
+# Parquet OHLCV cache
+# -----------------------------------------------------------------------------
+def _cache_path(symbol: str, interval: str, period: str) -> Path:
+    return Path(CACHE_DIR) / "yf" / f"{symbol}_{interval}_{period}.parquet"
+
+def load_ohlcv(symbol: str, interval: str, period: str) -> Optional[pd.DataFrame]:
+    """
+    Read a cached OHLCV frame, or None if it is missing or unreadable.
+    """
+    path = _cache_path(symbol, interval, period)
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+def is_fresh(symbol: str, interval: str, period: str) -> bool:
+    """
+    True if the cached frame was written less than CACHE_TTL seconds ago.
+    """
+    path = _cache_path(symbol, interval, period)
+    return path.exists() and time.time() - path.stat().st_mtime < CACHE_TTL
+
+def store_ohlcv(symbol: str, interval: str, period: str, df: pd.DataFrame) -> None:
+    """
+    Write a normalized OHLCV frame to the cache. Failures are logged, not raised.
+    """
+    path = _cache_path(symbol, interval, period)
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write beside the target and swap it in, so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning(f"Could not write cache file {path}: {e}")
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
+def merge_ohlcv(cached: pd.DataFrame, new: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    Append newly fetched bars to a cached frame and trim it back to `period`.
+    Bars present in both keep the new values (the last cached bar may have been partial).
+    """
+    df = pd.concat([cached, new], ignore_index=True)
+    df = df.drop_duplicates(subset="Date", keep="last").sort_values("Date", ignore_index=True)
+    return trim_to_period(df, period)
+
+def trim_to_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    Keep the trailing `period` of a frame, using yfinance period strings:
+    'Nd' counts trading sessions, 'Nmo'/'Ny' are calendar offsets from the last bar.
+    Unrecognized periods ('max', 'ytd', ...) are returned untrimmed.
+    """
+    if df.empty:
+        return df
+    dates = pd.to_datetime(df["Date"])
+    count = period[:-2] if period.endswith("mo") else period[:-1]
+    if not count.isdigit():
+        return df
+    n = int(count)
+
+    if period.endswith("d"):
+        sessions = dates.dt.normalize().unique()
+        start = sessions[max(len(sessions) - n, 0)]
+    elif period.endswith("mo"):
+        start = dates.iloc[-1].normalize() - pd.DateOffset(months=n)
+    elif period.endswith("y"):
+        start = dates.iloc[-1].normalize() - pd.DateOffset(years=n)
+    else:
+        return df
+    return df.loc[dates >= start].reset_index(drop=True)
@@ -1,29 +1,131 @@
 from supabase import create_client, Client
 from typing import List, Dict, Optional
-from .settings import SUPABASE_URL, SUPABASE_KEY
+from functools import lru_cache
+from importlib.util import find_spec
+import asyncio
+import httpx
+from .settings import SUPABASE_URL, SUPABASE_KEY, INSERT_BATCH_SIZE, SUPABASE_PG_URL, COPY_THRESHOLD
 import logging
 
 logger = logging.getLogger(__name__)
 
+COPY_COLUMNS = ("company", "ticker", "location", "failure_time")
+
+def _use_copy(records) -> bool:
+    # psycopg is optional (not in requirements.txt); without it large payloads use the REST path
+    return bool(SUPABASE_PG_URL) and len(records) >= COPY_THRESHOLD and find_spec("psycopg") is not None
+
+@lru_cache(maxsize=1)
+def _make_client() -> Client:
+    # One client per process; its httpx session is safe to share across threads
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
 def get_supabase_client() -> Optional[Client]:
     if not SUPABASE_URL or not SUPABASE_KEY:
         logger.warning("Supabase credentials are not set in environment.")
         return None
     try:
-        return create_client(SUPABASE_URL, SUPABASE_KEY)
+        return _make_client()
     except Exception as e:
         logger.exception("Failed to create Supabase client: %s", e)
         return None
 
-def insert_failures(records):
+def insert_failures(records, batch_size: int = INSERT_BATCH_SIZE):
+    """
+    Insert records in chunks of `batch_size` rows. Stops at the first failing
+    chunk; rows from earlier chunks stay inserted and are returned in `data`.
+    Large payloads go through bulk_insert_copy when SUPABASE_PG_URL is set.
+    """
+    if _use_copy(records):
+        return bulk_insert_copy(records)
+
     client = get_supabase_client()
     if not client:
         print("Supabase client not initialized.")
         return {"data": None, "error": "Client not initialized"}
-    
+
+    inserted = []
+    for start in range(0, len(records), batch_size):
+        chunk = records[start:start + batch_size]
+        try:
+            res = client.table("breakout_failures").insert(chunk).execute()
+        except Exception as e:
+            span = f"{start}-{start + len(chunk) - 1}"
+            print(f"Error inserting records {span} into supabase: {e}")
+            return {"data": inserted, "error": f"records {span}: {e}"}
+        inserted.extend(res.data or [])
+    return {"data": inserted, "error": None}
+
+def bulk_insert_copy(records, table: str = "breakout_failures"):
+    """
+    Stream records into Postgres with COPY over a direct connection (SUPABASE_PG_URL).
+    Runs in a single transaction; COPY returns no rows, so `data` is None on success.
+    """
+    if not SUPABASE_PG_URL:
+        return {"data": None, "error": "SUPABASE_PG_URL not set"}
+
+    # Optional dependency (pip install "psycopg[binary]"): only needed when SUPABASE_PG_URL is configured
+    import psycopg
+    from psycopg import sql
+
+    query = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(map(sql.Identifier, COPY_COLUMNS)),
+    )
     try:
-        res = client.table("breakout_failures").insert(records).execute()
-        return {"data": res.data, "error": None}
+        with psycopg.connect(SUPABASE_PG_URL) as conn:
+            with conn.cursor() as cur, cur.copy(query) as copy:
+                for r in records:
+                    copy.write_row(tuple(r.get(c) for c in COPY_COLUMNS))
     except Exception as e:
-        print(f"Error inserting records into supabase: {e}")
+        logger.error(f"Error copying records into postgres: {e}")
         return {"data": None, "error": str(e)}
+    return {"data": None, "error": None}
+
+@lru_cache(maxsize=1)
+def _make_async_http() -> httpx.AsyncClient:
+    # Talks to the PostgREST endpoint directly; reused across requests on the app's event loop
+    return httpx.AsyncClient(
+        base_url=f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Prefer": "return=representation",
+        },
+    )
+
+async def insert_failures_async(records, batch_size: int = INSERT_BATCH_SIZE):
+    """
+    Async variant of insert_failures: all chunks are posted concurrently.
+    Every chunk is attempted; errors are collected per record range.
+    Large payloads go through bulk_insert_copy (in a thread) when SUPABASE_PG_URL is set.
+    """
+    if _use_copy(records):
+        return await asyncio.to_thread(bulk_insert_copy, records)
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        logger.warning("Supabase credentials are not set in environment.")
+        return {"data": None, "error": "Client not initialized"}
+
+    client = _make_async_http()
+
+    async def post(chunk):
+        res = await client.post("/breakout_failures", json=chunk)
+        res.raise_for_status()
+        return res.json()
+
+    starts = range(0, len(records), batch_size)
+    results = await asyncio.gather(
+        *(post(records[start:start + batch_size]) for start in starts),
+        return_exceptions=True,
+    )
+
+    inserted, errors = [], []
+    for start, res in zip(starts, results):
+        if isinstance(res, Exception):
+            span = f"{start}-{min(start + batch_size, len(records)) - 1}"
+            logger.error(f"Error inserting records {span} into supabase: {res}")
+            errors.append(f"records {span}: {res}")
+        else:
+            inserted.extend(res or [])
+    return {"data": inserted, "error": "; ".join(errors) or None}
@@ -1,37 +1,90 @@
-from typing import List
+from typing import List, Tuple
 import pandas as pd
 import numpy as np
+import bottleneck as bn
 
-def compute_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
     """
-    Compute ATR (average true range) series.
-    Expects df to have columns: High, Low, Close
+    Trailing mean over up to `window` values, like rolling(window, min_periods=1).mean().
     """
-    h_l = df['High'] - df['Low']
-    h_pc = (df['High'] - df['Close'].shift(1)).abs()
-    l_pc = (df['Low'] - df['Close'].shift(1)).abs()
-    tr = pd.concat([h_l, h_pc, l_pc], axis=1).max(axis=1)
-    atr = tr.rolling(period, min_periods=1).mean()
-    return atr
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values
+    # bottleneck rejects windows longer than the input; with min_count=1 clamping is equivalent
+    return bn.move_mean(values, min(window, len(values)), min_count=1)
+
+def _centered_rolling(values: np.ndarray, window: int, move) -> np.ndarray:
+    """
+    Apply a bottleneck moving-window function over a centered window of
+    2*window+1 values; positions without a full window are NaN.
+    """
+    width = 2 * window + 1
+    out = np.full(len(values), np.nan)
+    if len(values) >= width:
+        # bottleneck windows are right-aligned: result[i] covers values[i-width+1:i+1]
+        out[window:len(values) - window] = move(values, width)[width - 1:]
+    return out
+
+def compute_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Compute ATR (average true range) from High, Low and Close arrays.
+    """
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    # fmax ignores the missing previous close on the first bar
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return rolling_mean(tr, period)
+
+def compute_vwap_bands(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    k: float,
+    window: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute cumulative VWAP, the rolling high-low range (ATR) and the VWAP ± k*ATR bands.
+    Returns (vwap, atr, upper, lower).
+    """
+    # Typical price * volume, built in place in a single buffer
+    pv = high + low
+    pv += close
+    pv *= volume / 3
+    vwap = np.cumsum(pv, out=pv)
+    # Leading zero-volume bars give NaN, as the pandas version did
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap /= np.cumsum(volume)
+
+    atr = rolling_mean(high - low, window)
+    offset = k * atr
+    return vwap, atr, vwap + offset, vwap - offset
 
 def find_local_maxima(series: pd.Series, window: int = 5) -> List[int]:
-    maxima_idx = []
-    n = len(series)
-    if n == 0:
-        return maxima_idx
-    for i in range(window, n - window):
-        current_val = series.iloc[i]
-        if (series.iloc[i - window:i + window + 1].drop(series.index[i]) <= current_val).all():
-            maxima_idx.append(i)
-    return maxima_idx
+    """
+    Positional indices whose value is >= every other value within `window` bars on each side.
+    Bars closer than `window` to either end are never reported.
+    """
+    values = series.to_numpy(dtype=float)
+    return np.flatnonzero(values == _centered_rolling(values, window, bn.move_max)).tolist()
 
 def find_local_minima(series: pd.Series, window: int = 5) -> List[int]:
-    minima_idx = []
-    n = len(series)
-    if n == 0:
-        return minima_idx
-    for i in range(window, n - window):
-        current_val = series.iloc[i]
-        if (series.iloc[i - window:i + window + 1].drop(series.index[i]) >= current_val).all():
-            minima_idx.append(i)
-    return minima_idx
+    """
+    Positional indices whose value is <= every other value within `window` bars on each side.
+    Bars closer than `window` to either end are never reported.
+    """
+    values = series.to_numpy(dtype=float)
+    return np.flatnonzero(values == _centered_rolling(values, window, bn.move_min)).tolist()
+
+def find_band_failures(close: np.ndarray, upper: np.ndarray, lower: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find bars where price re-enters the band after closing outside it on the previous bar.
+    Returns (failure indices, is_high mask) in chronological order; an upper band
+    failure takes precedence over a lower band failure on the same bar.
+    """
+    high_fail = (close[:-1] > upper[:-1]) & (close[1:] < upper[1:])
+    low_fail = ~high_fail & (close[:-1] < lower[:-1]) & (close[1:] > lower[1:])
+    fail_idx = np.flatnonzero(high_fail | low_fail)
+    return fail_idx + 1, high_fail[fail_idx]
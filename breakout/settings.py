@@ -11,3 +11,18 @@ DEFAULT_INTERVAL = os.getenv("DEFAULT_INTERVAL", "5m")
 
 K_FACTOR = float(os.getenv("K_FACTOR", "1.5"))
 LOCAL_WINDOW = int(os.getenv("LOCAL_WINDOW", "5"))
+
+# Concurrency for multi-ticker analysis (API batch endpoint and Streamlit app)
+ANALYZE_WORKERS = int(os.getenv("ANALYZE_WORKERS", "8"))
+ANALYZE_TIMEOUT = float(os.getenv("ANALYZE_TIMEOUT", "60"))
+
+# On-disk OHLCV / HTTP cache for Yahoo Finance downloads
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+
+# Rows per Supabase insert request
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "1000"))
+
+# Direct Postgres connection for COPY-based bulk inserts (optional; requires psycopg)
+SUPABASE_PG_URL = os.getenv("SUPABASE_PG_URL")
+COPY_THRESHOLD = int(os.getenv("COPY_THRESHOLD", "2000"))
@@ -1,38 +1,230 @@
-import yfinance as yf
-import pandas as pd
+import hashlib
+import json
+import random
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
 
-def test_yfinance_data(symbol="RELIANCE.NS", period="5d", interval="15m"):
-    print(f"Fetching {symbol} data from Yahoo Finance...")
+from breakout.settings import CACHE_DIR, CACHE_TTL
 
-    try:
-        # Fetch recent data
-        df = yf.download(symbol, period=period, interval=interval, progress=False)
+# yfinance, pandas and breakout.cache are imported inside the functions that use them so
+# that importing this module stays cheap; they load on the first actual fetch.
+
+RAW_CACHE_DIR = Path(CACHE_DIR) / "yf_raw"  # multi-symbol frames, next to breakout.cache's per-symbol files
+_MEM_CACHE_SIZE = 128
+_MEM_CACHE = OrderedDict()  # (symbols, period, interval) -> (fetched_at, frame)
+
+def _history_single(symbol, period, interval):
+    import pandas as pd
+    import yfinance as yf
+    from breakout.cache import get_http_session
+
+    # Match yf.download's output (unadjusted, with Adj Close) and skip dividend/split and
+    # pre/post-market processing that the summary never uses
+    # raise_errors: by default history() swallows request errors and returns an empty frame,
+    # which would leave _with_retry nothing to retry
+    df = yf.Ticker(symbol, session=get_http_session()).history(
+        period=period, interval=interval, auto_adjust=False, actions=False, prepost=False, raise_errors=True
+    )
+    # Same (symbol, field) layout as multi-symbol downloads
+    return pd.concat({symbol: df}, axis=1) if not df.empty else df
+
+class DownloadError(Exception):
+    """Every symbol in a yf.download call failed (yf.download records errors instead of raising)."""
+
+def _retryable_errors():
+    import requests
+    import yfinance as yf
+
+    errors = (requests.exceptions.RequestException, DownloadError)
+    # YFRateLimitError only exists in newer yfinance releases
+    rate_limit = getattr(getattr(yf, "exceptions", None), "YFRateLimitError", None)
+    return errors + (rate_limit,) if rate_limit else errors
+
+def _reported_errors():
+    """Errors test_yfinance_data reports instead of raising: exhausted retries, yfinance errors
+    (e.g. a delisted symbol) and malformed responses."""
+    import yfinance as yf
+
+    yf_error = getattr(getattr(yf, "exceptions", None), "YFException", None)
+    errors = _retryable_errors() + (KeyError,)
+    return errors + (yf_error,) if yf_error else errors
+
+def _with_retry(fn, *args, attempts=5):
+    """Call fn(*args), retrying transient HTTP/rate-limit errors with exponential backoff plus jitter."""
+    retryable = _retryable_errors()
+    for attempt in range(attempts):
+        try:
+            return fn(*args)
+        except retryable:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(2 ** attempt + random.random())
+
+def _download_many(symbol_list, period, interval):
+    import pandas as pd
+    import yfinance as yf
+    from yfinance import shared
+    from breakout.cache import get_http_session
+
+    # One call for all symbols: yf.download sends one request per ticker anyway and runs them
+    # in parallel (threads=True)
+    df = yf.download(
+        symbol_list, period=period, interval=interval, group_by="ticker", threads=True, progress=False,
+        session=get_http_session(),
+    )
+    # Per-symbol failures (429s included) only show up in yf.shared._ERRORS; when every
+    # symbol failed, raise so _with_retry backs off and tries again
+    errors = getattr(shared, "_ERRORS", None)
+    if df.empty and errors:
+        raise DownloadError(f"{len(errors)} failed download(s): {errors}")
+    if not df.empty and not isinstance(df.columns, pd.MultiIndex):
+        # Single-symbol downloads come back flat; give them the (symbol, field) layout
+        df = pd.concat({symbol_list[0]: df}, axis=1)
+    return df
+
+def _download(symbols, period, interval):
+    symbol_list = symbols.split()
+    if len(symbol_list) == 1:
+        return _with_retry(_history_single, symbol_list[0], period, interval)
+    return _with_retry(_download_many, symbol_list, period, interval)
+
+def _cached_download(symbols, period, interval, ttl=CACHE_TTL):
+    """
+    Return (fetched_at, frame) for (symbols, period, interval), reusing a parquet copy
+    younger than `ttl` seconds; `fetched_at` is when the data actually came from Yahoo.
+    """
+    import pandas as pd
+
+    key = hashlib.md5(f"{symbols}|{period}|{interval}".encode()).hexdigest()
+    path = RAW_CACHE_DIR / f"{key}.parquet"
+    meta_path = RAW_CACHE_DIR / f"{key}.meta.json"
+
+    if path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if time.time() - meta["ts"] < ttl:
+            return meta["ts"], pd.read_parquet(path, engine="pyarrow")
 
-        if df.empty:
-            print("❌ No data returned! Check the symbol or network.")
-            return
+    fetched_at = time.time()
+    df = _download(symbols, period, interval)
+    if not df.empty:
+        RAW_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(path, engine="pyarrow")
+        meta_path.write_text(json.dumps({"ts": fetched_at}))
+    return fetched_at, df
 
-        # Display basic info
-        print("\n✅ Data fetched successfully!\n")
-        print(df.head(10))
+def _fetch(symbols, period, interval, ttl=CACHE_TTL):
+    """
+    Memory LRU in front of the parquet cache (mem -> disk -> network).
+    Entries keep the original fetch time, so data is never older than `ttl` whichever tier
+    serves it; frames are shared, so callers get shallow copies.
+    """
+    key = (symbols, period, interval)
+    entry = _MEM_CACHE.get(key)
+    if entry is not None and time.time() - entry[0] < ttl:
+        _MEM_CACHE.move_to_end(key)
+        return entry[1]
+
+    fetched_at, df = _cached_download(symbols, period, interval, ttl)
+    _MEM_CACHE[key] = (fetched_at, df)
+    _MEM_CACHE.move_to_end(key)
+    if len(_MEM_CACHE) > _MEM_CACHE_SIZE:
+        _MEM_CACHE.popitem(last=False)
+    return df
+
+def _summary_lines(symbol, df, verbose=False):
+    from breakout.cache import REQUIRED_COLS
+
+    lines = []
+
+    # Display basic info
+    lines.append(f"\n✅ {symbol}: data fetched successfully!")
+    if verbose:
+        lines.append("")
+        lines.append(df.head(10).to_string())
 
         # Show column names and types
-        print("\n📊 Columns and types:")
-        print(df.dtypes)
+        lines.append("\n📊 Columns and types:")
+        lines.append(df.dtypes.to_string())
+
+    # Check if required columns exist
+    cols = frozenset(df.columns.tolist())
+    if REQUIRED_COLS <= cols:
+        lines.append("\n✅ All OHLCV columns are present.")
+    else:
+        lines.append(f"\n⚠️ Missing columns: {sorted(REQUIRED_COLS - cols)}")
+
+    # Show date range and frequency
+    if verbose and len(df):
+        # yfinance returns a sorted DatetimeIndex, so the bounds are the first/last labels
+        lines.append(f"\n📅 Date Range: {df.index[0]} → {df.index[-1]}")
+    lines.append(f"🕒 Total records: {len(df)}")
+    return lines
+
+def _write_parquet(frames, path):
+    """
+    Write {symbol: frame} as one long-format table (Symbol, timestamp, OHLCV...)
+    so downstream code can pl.scan_parquet / pq.read_table it without pandas.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    first = next(iter(frames.values()))
+    long_df = pd.concat(frames, names=["Symbol", first.index.name or "Datetime"]).reset_index()
+    table = pa.Table.from_pandas(long_df, preserve_index=False)
+    pq.write_table(table, path, compression="zstd", use_dictionary=True)
+
+def test_yfinance_data(symbols="RELIANCE.NS", period="5d", interval="15m", verbose=False, to_parquet_path=None):
+    """
+    Fetch and summarize one or more symbols ('RELIANCE.NS TCS.NS' or 'RELIANCE.NS,TCS.NS').
+    Returns the downloaded frame (None if the fetch fails); `verbose` adds head/dtypes/date-range output.
+    With `to_parquet_path`, the per-symbol data is also written there as zstd parquet.
+    """
+    import pandas as pd
+
+    # yf.download upper-cases tickers and keys its result by them, so match that (and drop repeats)
+    symbol_list = list(dict.fromkeys(symbols.upper().replace(",", " ").split()))
+    # Printed immediately: the fetch below can take a while
+    print(f"Fetching {', '.join(symbol_list)} data from Yahoo Finance...")
+
+    # The report is buffered and written to stdout in a single call
+    lines = []
+    try:
+        # Fetch recent data (served from memory / the local cache when fresh)
+        raw = _fetch(" ".join(symbol_list), period, interval).copy(deep=False)
+
+        if raw.empty:
+            lines.append("❌ No data returned! Check the symbol or network.")
+            return raw
+
+        frames = {}
+        for symbol in symbol_list:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if symbol not in raw.columns.get_level_values(0):
+                    lines.append(f"\n❌ No data returned for {symbol}!")
+                    continue
+                # Rows are the union across symbols; drop bars this symbol doesn't have
+                df = raw[symbol].dropna(how="all")
+            else:
+                df = raw
+            frames[symbol] = df
+            lines.extend(_summary_lines(symbol, df, verbose))
+
+        if to_parquet_path and frames:
+            _write_parquet(frames, to_parquet_path)
+            lines.append(f"\n💾 Saved {len(frames)} symbol(s) to {to_parquet_path}")
 
-        # Check if required columns exist
-        required_cols = {"Open", "High", "Low", "Close", "Volume"}
-        if required_cols.issubset(df.columns):
-            print("\n✅ All OHLCV columns are present.")
-        else:
-            print("\n⚠️ Missing columns:", required_cols - set(df.columns))
+        return raw
 
-        # Show date range and frequency
-        print(f"\n📅 Date Range: {df.index.min()} → {df.index.max()}")
-        print(f"🕒 Total records: {len(df)}")
+    # Only fetch failures are reported here; anything else is a bug and propagates
+    except _reported_errors() as e:
+        lines.append(f"❌ Error fetching data for {symbols}: {e}")
+        return None
 
-    except Exception as e:
-        print(f"❌ Error fetching data for {symbol}: {e}")
+    finally:
+        sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
-    test_yfinance_data()
+    test_yfinance_data(verbose=True)